@@ -1,15 +1,32 @@
 #!/usr/bin/python
 # Encoding: utf8
 
-import sys, os
-from distutils.core import setup
+import sys, os, re
+from setuptools import setup
 
-VERSION     = os.popen("""grep __version__ src/py/tdoc/__init__.py | head -n1 | cut -d'"' -f2""").read().split("\n")[0]
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src/py/tdoc/__init__.py")) as f:
+	VERSION_MATCH = re.search(r'__version__\s*=\s*"([^"]+)"', f.read())
+VERSION     = VERSION_MATCH.group(1) if VERSION_MATCH else ""
 SUMMARY     = "Tree Document Format"
 DESCRIPTION = """\
 TDoc is a text format to write XML-compatible trees.
 """
 
+# NOTE: The Cython build is opt-in (`TDOC_CYTHON=1 python setup.py build_ext`),
+# the pure Python sources are always installed and used as a fallback when
+# the compiled modules are not available. The modules are compiled as-is,
+# with the default directives: the parser relies on negative indexing (eg.
+# `v[-1]`), so `wraparound=False` and `boundscheck=False` would be unsafe.
+try:
+	from Cython.Build import cythonize
+except ImportError:
+	cythonize = None
+
+EXT_MODULES = cythonize(
+	["src/py/tdoc/command.py", "src/py/tdoc/parser.py"],
+	language_level=3,
+) if cythonize and os.environ.get("TDOC_CYTHON") else []
+
 # ------------------------------------------------------------------------------
 #
 # SETUP DECLARATION
@@ -28,6 +45,8 @@ setup(
 	package_dir = { "": "src/py" },
 	packages    = ["tdoc"],
 	scripts     = ["bin/tdoc"],
+	ext_modules = EXT_MODULES,
+	python_requires = ">=3.9",
 	classifiers = [
 	"Development Status :: 4 - Beta",
 	"Environment :: Console",
@@ -1,22 +1,56 @@
-import sys, argparse
-from typing import Optional, Type, Any
-from tdoc.parser import EMITTERS, Emitter, ParseOptions, parsePath
-import os
+import sys, argparse, functools, itertools
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Any
+from tdoc.parser import EMITTERS, Emitter, ParseOptions, parseBytes
 
+_DEFAULT_EMITTER: str = next(iter(EMITTERS))
+# The help text for the options is derived from the `ParseOptions` annotations.
+_PARSE_OPTIONS_DOC: dict[str, str] = {
+    k: str(v) for k, v in ParseOptions.__annotations__.items()
+}
 
-def doc(t: Type, field: str) -> Optional[str]:
-    if field in t.__annotations__:
-        return f"{t.__annotations__[field]}"
-    else:
-        return None
 
+def resolveEmitter(name: str) -> Optional[str]:
+    """Resolves the given name to a registered emitter name, which can be
+    abbreviated as long as the prefix is not ambiguous (eg. `ev` for
+    `events`). Returns `None` when there is no match."""
+    # NOTE: Exact names are a dict lookup, only abbreviations are matched
+    # against the (handful of) registered names.
+    if name in EMITTERS:
+        return name
+    matches = [_ for _ in EMITTERS if _.startswith(name)] if name else []
+    return matches[0] if len(matches) == 1 else None
 
-def run(args: Optional[list[str]] = None, name="tdoc") -> int:
-    """Command-line interface to the TDoc parser."""
-    if args is None:
-        args = sys.argv[1:]
+
+class EmitterChoice(argparse.Action):
+    """Validates the emitter name against `EMITTERS` at parse time, so that
+    emitters registered after the parser is built are also accepted."""
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        if (resolved := resolveEmitter(values)) is None:
+            raise argparse.ArgumentError(
+                self,
+                f"invalid choice: {values!r} (choose from {', '.join(map(repr, EMITTERS))})",
+            )
+        setattr(namespace, self.dest, resolved)
+
+
+def read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def doc(field: str) -> Optional[str]:
+    return _PARSE_OPTIONS_DOC.get(field)
+
+
+@functools.lru_cache(maxsize=1)
+def _build_parser(name: Optional[str] = "tdoc") -> argparse.ArgumentParser:
+    """Builds the command-line argument parser. The result is cached so that
+    repeated calls to `run()` reuse the same parser."""
     oparser = argparse.ArgumentParser(
-        prog=name or os.path.basename(__file__.split(".")[0]),
+        prog=name or "tdoc",
         description="Parser and transpiler for TDoc <http://tlang.org/tdoc>",
     )
     oparser.add_argument(
@@ -29,25 +63,25 @@ def run(args: Optional[list[str]] = None, name="tdoc") -> int:
     oparser.add_argument(
         "-O",
         "--output-format",
-        action="store",
+        action=EmitterChoice,
         dest="outputFormat",
-        choices=list(EMITTERS.keys()),
-        default=next(_ for _ in EMITTERS),
-        help=doc(ParseOptions, "outputFormat"),
+        default=_DEFAULT_EMITTER,
+        metavar="{" + ",".join(EMITTERS) + "}",
+        help=f"The output format (default: {_DEFAULT_EMITTER})",
     )
     oparser.add_argument(
         "-r",
         "--root",
         action="store",
         dest="rootNode",
-        help=doc(ParseOptions, "rootNode"),
+        help=doc("rootNode"),
     )
     oparser.add_argument(
         "-c",
         "--with-comments",
         action="store_true",
         dest="comments",
-        help=doc(ParseOptions, "comments"),
+        help=doc("comments"),
     )
     oparser.add_argument(
         "-e",
@@ -62,7 +96,7 @@ def run(args: Optional[list[str]] = None, name="tdoc") -> int:
         type=str,
         default=None,
         dest="embedNode",
-        help=doc(ParseOptions, "embedNode"),
+        help=doc("embedNode"),
     )
     oparser.add_argument(
         "-es",
@@ -70,7 +104,7 @@ def run(args: Optional[list[str]] = None, name="tdoc") -> int:
         type=str,
         default=None,
         dest="embedStart",
-        help=doc(ParseOptions, "embedStart"),
+        help=doc("embedStart"),
     )
     oparser.add_argument(
         "-el",
@@ -78,7 +112,7 @@ def run(args: Optional[list[str]] = None, name="tdoc") -> int:
         type=str,
         default=None,
         dest="embedLine",
-        help=doc(ParseOptions, "embedLine"),
+        help=doc("embedLine"),
     )
     oparser.add_argument(
         "-ee",
@@ -86,17 +120,47 @@ def run(args: Optional[list[str]] = None, name="tdoc") -> int:
         type=str,
         default=None,
         dest="embedEnd",
-        help=doc(ParseOptions, "embedLEnd"),
+        help=doc("embedLEnd"),
     )
+    return oparser
+
+
+def run(args: Optional[list[str]] = None, name="tdoc") -> int:
+    """Command-line interface to the TDoc parser."""
+    if args is None:
+        args = sys.argv[1:]
     # We create the parse and register the options
-    opts = oparser.parse_args(args=args)
+    opts = _build_parser(name).parse_args(args=args)
     # We extract parser optios
     parse_options = ParseOptions(
-        **{k: v for k, v in vars(opts).items() if k not in ("files", "outputFormat")}
+        comments=opts.comments,
+        rootNode=opts.rootNode,
+        embed=opts.embed,
+        embedNode=opts.embedNode,
+        embedLine=opts.embedLine,
+        embedStart=opts.embedStart,
+        embedEnd=opts.embedEnd,
     )
     emitter: Emitter[Any] = EMITTERS[opts.outputFormat]()
-    for path in opts.files:
-        parsePath(path, options=parse_options, emitter=emitter)
+    if opts.files:
+        # Files are read in background threads so that reading the next file
+        # overlaps with the parsing of the current one. Results are consumed
+        # in order, so the output is the same as a sequential run.
+        workers = min(8, len(opts.files))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            paths = iter(opts.files)
+            # At most `workers` files are read ahead of the one being parsed,
+            # the next one is queued as each file is consumed.
+            pending: deque[Future[bytes]] = deque(
+                pool.submit(read, _) for _ in itertools.islice(paths, workers)
+            )
+            while pending:
+                data = pending.popleft().result()
+                if (path := next(paths, None)) is not None:
+                    pending.append(pool.submit(read, path))
+                # The emitter is reused across files, and reset in between.
+                emitter.reset()
+                parseBytes(data, options=parse_options, emitter=emitter)
     return 0
 
 
@@ -12,7 +12,7 @@ from typing import (
     NamedTuple,
     cast,
 )
-import re, sys, os, logging, json, xml.sax.saxutils  # nosec B406
+import re, io, sys, os, codecs, itertools, logging, json
 from enum import Enum
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
@@ -25,7 +25,9 @@ T = TypeVar("T")
 #     tlang_tree = None
 
 # TODO: The parser should yield its position (line, column) and a value
-# being either Skip, string, Warning, or Error
+# being either Skip, string, Warning, or Error. The position should be
+# derived lazily when an error is reported (the column from the line
+# itself), not tracked per character in `feed`.
 
 # TODO: In embedded, empty elemnts might popup inbetween comments, so
 # we should put an option to strip them.
@@ -82,8 +84,11 @@ class ParseOptions:
     ] = None
 
     @property
-    def isEmbedded(self):
-        return self.embed or self.embedLine or self.embedStart or self.embedEnd
+    def isEmbedded(self) -> bool:
+        # NOTE: This is not precomputed as options are mutable (the parser
+        # updates `indentPrefix`, the CLI may set the fields), so we keep
+        # the cheapest test (the `embed` flag) first.
+        return bool(self.embed or self.embedLine or self.embedStart or self.embedEnd)
 
 
 @dataclass
@@ -112,28 +117,40 @@ class ParsedNode(NamedTuple):
     ns: Optional[str]
     name: str
     value: str
-    attributes: list[ParsedAttribute]
+    attributes: tuple[ParsedAttribute, ...]
     content: str
 
 
 class StackItem(NamedTuple):
     depth: int
-    ns: str
+    ns: Optional[str]
     name: str
 
 
+# NOTE: The patterns are written so that they don't backtrack (see below).
 NAME = r"[A-Za-z0-9\-_]+"
-STR_SQ = r"'(\\'|[^'])*'"
-STR_DQ = r'"(\\"|[^"])*"'
+# NOTE: Quoted strings use the "unrolled loop" form `normal* (escape normal*)*`,
+# where runs of regular characters are consumed in one go and the
+# alternatives can't overlap. The tempting `(?:[^']+|\\.)*` form nests
+# quantifiers and backtracks exponentially on unterminated strings.
+STR_SQ = r"'[^'\\]*(?:\\.[^'\\]*)*'"
+STR_DQ = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+# The compiled forms, for matching quoted strings on their own.
+RE_STR_SQ = re.compile(STR_SQ)
+RE_STR_DQ = re.compile(STR_DQ)
 
 # A value is either a quoted string or a sequence without spaces
 VALUE = f"({STR_SQ}|{STR_DQ}|" r"[^ \t\r\n]+)"
-INLINE_ATTR = f"({NAME}:)?{NAME}={VALUE}"
+# NOTE: In node lines, a bare value can't also read as a complete quoted
+# string followed by a separator. Otherwise, when a line fails to match,
+# both readings get retried for each quoted attribute, which is
+# exponential in the number of attributes.
+NODE_VALUE = f"({STR_SQ}|{STR_DQ}|(?!(?:{STR_SQ}|{STR_DQ})(?:[ ]|$))" r"[^ \t\r\n]+)"
+INLINE_ATTR = f"({NAME}:)?{NAME}={NODE_VALUE}"
 
 # Attributes are like NAME=VALUE
 # FIXME: Not sure where this is used, might be a @attr name=value
 RE_ATTR = re.compile(f"[ \t]*((?P<ns>{NAME}):)?(?P<name>{NAME})=(?P<value>{VALUE})?")
-RE_COMMENT = re.compile(r"^\t*#.*")
 
 # Nodes are like NS:NAME|PARSER ATTR=VALUE: CONTENT
 RE_NODE = re.compile(
@@ -154,13 +171,15 @@ class Parser:
     sources and makes it possible to pause/resume parsing.
     """
 
-    def __init__(self, options: ParseOptions = ParseOptions()):
+    def __init__(self, options: Optional[ParseOptions] = None):
         # TODO: These should be moved into the stack
         self.customParser: Optional[str] = None
         self.customParserDepth: Optional[int] = None
-        self.options = options
+        self.options = ParseOptions() if options is None else options
         self.setIndent(IndentMode.TABS, 1)
         self.stack: list[StackItem] = []
+        # Parsed node lines, see `parseNodeLine`
+        self._nodeCache: dict[str, ParsedNode] = {}
 
     def setIndent(self, mode: IndentMode, count: int = 1):
         """Sets the indentation level for the parser. This updates the
@@ -169,6 +188,13 @@ class Parser:
         self._indentMode = mode
         self._indentCount = count
         self._indentPrefix = ("\t" if mode == IndentMode.TABS else " ") * count
+        # Single-character prefixes (the default TAB) take a fast path
+        # based on `str.lstrip`.
+        self._indentChar: Optional[str] = (
+            self._indentPrefix if len(self._indentPrefix) == 1 else None
+        )
+        # Otherwise the indentation is matched in one go by a regexp.
+        self._indentRe = re.compile(f"(?:{re.escape(self._indentPrefix)})*")
         # The lastLineDepth is used to keep track of the depth of the last parsed
         # line, which is used by the embedded parser.
         self.lastLineDepth: int = 0
@@ -211,12 +237,18 @@ class Parser:
 
     def feed(self, line: str, emitter: "Emitter[T]") -> Iterator[T]:
         """Feeds a line into the parser, which produces a directive for
-        the emitter and may affect the state of the parser."""
+        the emitter and may affect the state of the parser. A trailing
+        EOL is removed, if any."""
+        if line[-1:] == "\n":
+            line = line[:-1]
         # We get the line indentation, store it as `i`
         depth, l = self.getLineIndentation(line)
         # NOTE: We use stopped as a way to exit the loop early, as we're
         # using an iterator.
         stopped = False
+        # NOTE: Unless `onAttribute` is overridden, only `tdoc:`
+        # attributes need it, the others go straight to the emitter.
+        direct = type(self).onAttribute is Parser.onAttribute
         self.lastLineDepth = depth
         # --- CUSTOM PARSER ---
         if self.customParser:
@@ -226,9 +258,7 @@ class Parser:
                 # That's a nested line, with an indentation greater than
                 # the indentation of the custom parser
                 yield from emitter.onRawContentLine(
-                    self.stripLineIndentation(
-                        line[:-1], (self.customParserDepth or 0) + 1
-                    )
+                    self.stripLineIndentation(line, (self.customParserDepth or 0) + 1)
                 )
                 stopped = True
             elif not l:
@@ -240,63 +270,75 @@ class Parser:
                 self.customParser = None
                 self.customParserDepth = None
         # --- NOT WITHIN CUSTOM PARSER ---
+        # NOTE: We dispatch on the first character of the non-indented line,
+        # so that only the lines that may be nodes go through `matchNode`.
+        c = l[:1]
         if stopped:
             pass
-        elif self.isComment(l):
+        elif c == "#":
             # BRANCH: COMMENT
             # It's a COMMENT
-            yield from emitter.onCommentLine(l[1:-1], depth)
-        elif self.isAttribute(l):
+            yield from emitter.onCommentLine(l[1:], depth)
+        elif c == "@":
             # BRANCH: ATTRIBUTE
             # It's an ATTRIBUTE
-            ns, name, value = self.parseAttributeLine(l[:-1])
+            ns, name, value = self.parseAttributeLine(l)
             yield from self.onAttribute(emitter, ns, name, value)
-        elif match := self.matchNode(l):
+        elif c == ":":
+            # BRANCH: EXPLICIT CONTENT
+            yield from emitter.onContentLine(l[1:])
+        elif c and (node := self.parseNodeLine(l)):
             # If is a node only if it's not too indented. If it is too
             # indented, it's a text.
-            if depth > self.depth + 1:
+            # NOTE: The stack and its depth are bound locally, as they're
+            # accessed several times below.
+            stack = self.stack
+            current_depth = stack[-1].depth if stack else 0
+            if depth > current_depth + 1:
                 # BRANCH: TEXT CONTENT
                 # The current line is TOO INDENTED (more than expected), so we consider
                 # it to be TEXT CONTENT
-                yield from emitter.onContentLine(l[:-1])
+                yield from emitter.onContentLine(l)
             else:
                 # BRANCH: TEXT NODE
                 # Here we're sure it's a NODE
-                if depth <= self.depth:
+                if depth <= current_depth:
                     # If it's DEDENTED, we need to pop the stack up until we
                     # reach a depth that's lower than `depth`.
-                    while self.stack and self.depth >= depth:
-                        d = self.stack.pop()
+                    while stack and stack[-1].depth >= depth:
+                        d = stack.pop()
                         # STEP: END PREVIOUS NODE
                         yield from emitter.onNodeEnd(d.ns, d.name, None)
                 else:
                     # Here, the indentation must be stricly one more level
                     # up.
-                    if depth != self.depth + 1:
+                    if depth != current_depth + 1:
                         raise RuntimeError(
-                            f"Parsing depth should be {self.depth + 1}, got {depth}"
+                            f"Parsing depth should be {current_depth + 1}, got {depth}"
                         )
-                # We parse the node line
-                ns, name, parser, attr, content = self.parseNode(match)
-                self.stack.append(StackItem(depth, ns, name))
+                ns, name, parser, attr, content = node
+                stack.append(StackItem(depth, ns, name))
                 if parser:
-                    self.customParser = match["parser"]
+                    self.customParser = parser
                     self.customParserDepth = depth
                 # Now we have the node start
                 yield from emitter.onNodeStart(ns, name, parser)
                 # Followed by the attributes, if any
-                attr = list(attr)
-                for ns, name, value in attr:
-                    yield from self.onAttribute(emitter, ns, name, value)
+                emit_attribute = emitter.onAttribute
+                for attr_ns, attr_name, attr_value in attr:
+                    if direct and attr_ns != "tdoc":
+                        yield from emit_attribute(attr_ns, attr_name, attr_value)
+                    else:
+                        yield from self.onAttribute(
+                            emitter, attr_ns, attr_name, attr_value
+                        )
                 yield from emitter.onNodeContentStart(ns, name, parser)
                 # And then the first line of content, if any
                 if content is not None:
                     yield from emitter.onContentLine(content)
-        elif self.isExplicitContent(l):
-            yield from emitter.onContentLine(l[1:-1])
         else:
             # FIXME: See feature-whitespace, there's a problem there
-            text = self.stripLineIndentation(line, self.depth)[:-1]
+            text = self.stripLineIndentation(line, self.depth)
             if text:
                 yield from emitter.onContentLine(text)
 
@@ -306,7 +348,7 @@ class Parser:
 
     def isComment(self, line: str) -> bool:
         "Tells if the given line is a COMMENT line." ""
-        return bool(RE_COMMENT.match(line))
+        return bool(line and line[0] == "#")
 
     def isExplicitContent(self, line: str) -> bool:
         "Tells if the given line is an EXPLICIT CONTENT line." ""
@@ -316,6 +358,25 @@ class Parser:
         """Tells if this line is node line"""
         return RE_NODE.match(line)
 
+    def parseNodeLine(self, line: str) -> Optional[ParsedNode]:
+        """Parses the given line as a node, returning `None` if it's not a
+        node line. Results are cached, as node lines are often repeated
+        verbatim (list items, table rows, shapes). The cached nodes are
+        shared, and their attributes are a tuple."""
+        cache = self._nodeCache
+        if node := cache.get(line):
+            return node
+        if not (match := self.matchNode(line)):
+            return None
+        node = self.parseNode(match)
+        # NOTE: The cache is kept small and reset when full: documents with
+        # mostly unique lines would otherwise pay for the tracking of many
+        # long-lived nodes by the garbage collector.
+        if len(cache) >= 1024:
+            cache.clear()
+        cache[line] = node
+        return node
+
     def isAttribute(self, line: str) -> bool:
         """Tells if this line is attribute line"""
         return bool(line and line[0] == "@")
@@ -344,25 +405,28 @@ class Parser:
     # SPECIFIC PARSERS
     # =========================================================================
 
-    def parseNode(
-        self, match: re.Match[str]
-    ) -> tuple[str, str, str, list[tuple[Optional[str], str, str]], str]:
-        attrs: list[ParsedAttribute] = [
-            _ for _ in self.parseAttributes(match.group("attrs"))
-        ]
+    def parseNode(self, match: re.Match[str]) -> ParsedNode:
         nid = match.group("id")
+        attrs: tuple[ParsedAttribute, ...]
         if nid:
-            l: list[ParsedAttribute] = ParsedAttribute(None, "id", nid)
-            for _ in list(attrs):
-                if _[1] == "id" and _[0] is None:
+            # The inline `#id` comes first, unless an explicit `id=` attribute
+            # overrides it. This is a single pass over the attributes.
+            l: list[ParsedAttribute] = [ParsedAttribute(None, "id", nid)]
+            for _ in self.parseAttributes(match.group("attrs")):
+                if _.name == "id" and _.ns is None:
                     # TODO: We might want to issue a warning there
                     l[0] = _
                 else:
                     l.append(_)
-            attrs = l
+            attrs = tuple(l)
+        else:
+            attrs = tuple(self.parseAttributes(match.group("attrs")))
+        # NOTE: Node names are overwhelmingly repeated, interning them means
+        # the emitters get the same string object for each occurrence.
+        ns, name = match.group("ns", "name")
         return ParsedNode(
-            cast(str, match.group("ns")),
-            cast(str, match.group("name")),
+            cast(str, ns and sys.intern(ns)),
+            cast(str, sys.intern(name)),
             cast(str, match.group("parser")),
             attrs,
             cast(str, match.group("content")),
@@ -371,15 +435,14 @@ class Parser:
     def parseAttributes(self, line: str) -> Iterator[ParsedAttribute]:
         """Parses the attributes and returns a stream of `(key,value)` pairs."""
         # We remove the trailing spaces.
-        while line and line[-1] in "\n \t":
-            line = line[:-1]
+        line = line.rstrip("\n \t")
         # Inline attributes are like
         #   ATTR=VALUE ATTR=VALUE…
         # Where value can be unquoted, single quoted or double quoted,
         # with \" or \' to escape quotes.
         o = 0
         while m := RE_ATTR.match(line, o):
-            v = m.group("value")
+            ns, name, v = m.group("ns", "name", "value")
             if not v:
                 w = v
             # This little dance corrects the string escaping
@@ -391,12 +454,17 @@ class Parser:
                 if s != e:
                     w = v
                 elif s == '"':
-                    w = v[1:-1].replace('\\"', '"')
+                    w = v[1:-1]
+                    # Most values have no escapes, so we skip the replace.
+                    if "\\" in w:
+                        w = w.replace('\\"', '"')
                 elif s == "'":
-                    w = v[1:-1].replace("\\'", "'")
+                    w = v[1:-1]
+                    if "\\" in w:
+                        w = w.replace("\\'", "'")
                 else:
                     w = v
-            yield ParsedAttribute(m.group("ns"), m.group("name"), w or "")
+            yield ParsedAttribute(ns and sys.intern(ns), sys.intern(name), w or "")
             o = m.end()
 
     def parseAttributeLine(self, line):
@@ -424,22 +492,26 @@ class Parser:
         """Returns the indentation for the line and the non-indented part of
         the line."""
         # TODO: We should support other indentation methods
-        n = len(line)
-        i = 0  # The indent level
-        o = 0  # The character offset
-        while o < n and line.startswith(self._indentPrefix, o):
-            i += 1
-            o += len(self._indentPrefix)
-        l = line[o:] if o > 0 else line
-        return i, l
+        if self._indentChar:
+            l = line.lstrip(self._indentChar)
+            return len(line) - len(l), l
+        o = self._indentRe.match(line).end()  # type: ignore[union-attr]
+        if not o:
+            return 0, line
+        return o // len(self._indentPrefix), line[o:]
 
     def stripLineIndentation(self, line: str, indent: int) -> str:
         """Strips the indentation from the given line."""
+        if self._indentChar:
+            # NOTE: This strips up to `indent + 1` prefixes, like the
+            # general case below.
+            n = min(len(line) - len(line.lstrip(self._indentChar)), indent + 1)
+            return line[n:] if n > 0 else line
+        if indent < 0:
+            return line
         n = len(self._indentPrefix)
-        while indent >= 0 and line.startswith(self._indentPrefix):
-            line = line[n:]
-            indent -= 1
-        return line
+        o = min(self._indentRe.match(line).end(), (indent + 1) * n)  # type: ignore[union-attr]
+        return line[o:] if o > 0 else line
 
 
 # -----------------------------------------------------------------------------
@@ -453,7 +525,10 @@ class Emitter(ABC, Generic[T]):
     """An abstract interface for the parser emitter. The emitter yields
     values that are then handled by a writer. In other words, it transforms
     the stream of events produced by the parser in a stream of values to
-    be written."""
+    be written.
+
+    Each handler returns an iterable of values, typically by being a
+    generator, or by returning a tuple when the values are known upfront."""
 
     @classmethod
     def GetDefault(cls):
@@ -466,48 +541,54 @@ class Emitter(ABC, Generic[T]):
         self.options = options
         return self
 
+    def reset(self):
+        """Resets the per-document state of the emitter, so that the same
+        instance can be reused to process another document. Emitters
+        that keep state across events must override this."""
+        return self
+
     @abstractmethod
-    def onDocumentStart(self, options: ParseOptions) -> Iterator[T]:
+    def onDocumentStart(self, options: ParseOptions) -> Iterable[T]:
         ...
 
     @abstractmethod
-    def onDocumentEnd(self) -> Iterator[T]:
+    def onDocumentEnd(self) -> Iterable[T]:
         ...
 
     @abstractmethod
     def onNodeStart(
         self, ns: Optional[str], name: str, process: Optional[str]
-    ) -> Iterator[T]:
+    ) -> Iterable[T]:
         ...
 
     @abstractmethod
     def onNodeContentStart(
         self, ns: Optional[str], name: str, process: Optional[str]
-    ) -> Iterator[T]:
+    ) -> Iterable[T]:
         ...
 
     @abstractmethod
     def onNodeEnd(
         self, ns: Optional[str], name: str, process: Optional[str]
-    ) -> Iterator[T]:
+    ) -> Iterable[T]:
         ...
 
     @abstractmethod
     def onAttribute(
         self, ns: Optional[str], name: str, value: Optional[str]
-    ) -> Iterator[T]:
+    ) -> Iterable[T]:
         ...
 
     @abstractmethod
-    def onContentLine(self, text: str) -> Iterator[T]:
+    def onContentLine(self, text: str) -> Iterable[T]:
         ...
 
     @abstractmethod
-    def onRawContentLine(self, text: str) -> Iterator[T]:
+    def onRawContentLine(self, text: str) -> Iterable[T]:
         ...
 
     @abstractmethod
-    def onCommentLine(self, text: str, indent: int) -> Iterator[T]:
+    def onCommentLine(self, text: str, indent: int) -> Iterable[T]:
         ...
 
 
@@ -518,36 +599,57 @@ class Emitter(ABC, Generic[T]):
 # -----------------------------------------------------------------------------
 
 
+# The event types produced by the `EventEmitter`, as the first item of each
+# event tuple.
+EV_DOC_START = 0
+EV_DOC_END = 1
+EV_NODE_START = 2
+EV_NODE_CONTENT_START = 3
+EV_NODE_END = 4
+EV_ATTRIBUTE = 5
+EV_CONTENT = 6
+EV_RAW_CONTENT = 7
+EV_COMMENT = 8
+
+# Events without arguments are immutable, and can be shared.
+_DOC_START = (EV_DOC_START,)
+_DOC_END = (EV_DOC_END,)
+
+
 class EventEmitter(Emitter):
-    """A emitter that outputs an event stream."""
+    """A emitter that outputs an event stream, where each event is a tuple
+    starting with its `EV_*` type."""
 
     def __init__(self):
         self.options = None
 
     def onDocumentStart(self, options: ParseOptions):
         self.options = options
-        yield ("DocumentStart",)
+        yield _DOC_START
 
     def onDocumentEnd(self):
-        yield ("DocumentEnd",)
+        yield _DOC_END
 
     def onNodeStart(self, ns: Optional[str], name: str, process: Optional[str]):
-        yield ("NodeStart", ns, name, process)
+        yield (EV_NODE_START, ns, name, process)
+
+    def onNodeContentStart(self, ns: Optional[str], name: str, process: Optional[str]):
+        yield (EV_NODE_CONTENT_START, ns, name, process)
 
     def onNodeEnd(self, ns: Optional[str], name: str, process: Optional[str]):
-        yield ("NodeEnd", ns, name, process)
+        yield (EV_NODE_END, ns, name, process)
 
     def onAttribute(self, ns: Optional[str], name: str, value: Optional[str]):
-        yield ("Attribute", ns, name, value)
+        yield (EV_ATTRIBUTE, ns, name, value)
 
     def onContentLine(self, text: str):
-        yield ("Content", text)
+        yield (EV_CONTENT, text)
 
     def onRawContentLine(self, text: str):
-        yield ("RawContent", text)
+        yield (EV_RAW_CONTENT, text)
 
     def onCommentLine(self, text: str, indent: int):
-        yield ("Comment", text)
+        yield (EV_COMMENT, text)
 
 
 # -----------------------------------------------------------------------------
@@ -560,29 +662,35 @@ class EventEmitter(Emitter):
 class NullEmitter(Emitter):
     """A emitter that outputs nothing."""
 
+    # NOTE: The handlers all return the same empty tuple, so that no
+    # generator is created per event: the null emitter is used to measure
+    # and validate the parsing itself.
     def onDocumentStart(self, options: ParseOptions):
-        yield None
+        return ()
 
     def onDocumentEnd(self):
-        yield None
+        return ()
 
     def onNodeStart(self, ns: Optional[str], name: str, process: Optional[str]):
-        yield None
+        return ()
+
+    def onNodeContentStart(self, ns: Optional[str], name: str, process: Optional[str]):
+        return ()
 
     def onNodeEnd(self, ns: Optional[str], name: str, process: Optional[str]):
-        yield None
+        return ()
 
     def onAttribute(self, ns: Optional[str], name: str, value: Optional[str]):
-        yield None
+        return ()
 
     def onContentLine(self, text: str):
-        yield None
+        return ()
 
     def onRawContentLine(self, text: str):
-        yield None
+        return ()
 
     def onCommentLine(self, text: str, indent: int):
-        yield None
+        return ()
 
 
 # -----------------------------------------------------------------------------
@@ -599,8 +707,19 @@ class TDocEmitter(Emitter[Optional[str]]):
 
     def __init__(self):
         self.options = None
-        self.indent = ""
+        self.reset()
+
+    def reset(self):
+        self.depth = 0
+        # The indentation strings, indexed by depth, so that they are
+        # not rebuilt on each node.
+        self._indentCache: list[str] = [""]
         self.attrIndex = 0
+        return self
+
+    @property
+    def indent(self) -> str:
+        return self._indentCache[self.depth]
 
     def onDocumentStart(self, options: ParseOptions):
         self.options = options
@@ -610,15 +729,18 @@ class TDocEmitter(Emitter[Optional[str]]):
         yield None
 
     def onNodeStart(self, ns: Optional[str], name: str, process: Optional[str]):
-        yield f"{self.indent}{ns+':' if ns else ''}{name}{'|'+process if process else ''}"
-        self.indent += "\t"
+        yield f"{self._indentCache[self.depth]}{ns+':' if ns else ''}{name}{'|'+process if process else ''}"
+        self.depth += 1
+        if self.depth == len(self._indentCache):
+            self._indentCache.append("\t" * self.depth)
         self.attrIndex = 0
 
     def onNodeContentStart(self, ns: Optional[str], name: str, process: Optional[str]):
         yield "\n"
 
     def onNodeEnd(self, ns: Optional[str], name: str, process: Optional[str]):
-        self.indent = self.indent[:-1]
+        if self.depth > 0:
+            self.depth -= 1
         yield None
 
     def onAttribute(self, ns: Optional[str], name: str, value: Optional[str]):
@@ -642,10 +764,10 @@ class TDocEmitter(Emitter[Optional[str]]):
         self.attrIndex += 1
 
     def onContentLine(self, text: str):
-        yield f"{self.indent}{text}\n"
+        yield f"{self._indentCache[self.depth]}{text}\n"
 
     def onRawContentLine(self, text: str):
-        yield f"{self.indent}{text}\n"
+        yield f"{self._indentCache[self.depth]}{text}\n"
 
     def onCommentLine(self, text: str, indent: int):
         yield f"{'	' * indent}#{text}\n"
@@ -663,76 +785,94 @@ class XMLEmitter(Emitter):
 
     def __init__(self):
         super().__init__()
+        self.reset()
+
+    def reset(self):
         self.isCurrentNodeClosed = True
         self.hasPreviousNode = False
         self.isCurrentNodeEmpty = True
+        return self
 
     # =========================================================================
     # HANDLERS
     # =========================================================================
 
+    # NOTE: The handlers return tuples rather than being generators, which
+    # saves the creation of a generator for each parser event.
+
     def onDocumentStart(self, options: ParseOptions):
-        yield '<?xml version="1.0"?>\n'
+        return ('<?xml version="1.0"?>\n',)
 
     def onDocumentEnd(self):
-        yield None
+        return ()
 
     def onNodeStart(self, ns: Optional[str], name: str, process: Optional[str]):
-        if not self.isCurrentNodeClosed:
-            yield ">"
+        # NOTE: Separate f-strings avoid building the intermediate `ns:`
+        # string.
         if ns == "pi":
-            yield f"<?{name}"
+            start = f"<?{name}"
+        elif ns:
+            start = f"<{ns}:{name}"
         else:
-            yield f"<{ns+':' if ns else ''}{name}"
+            start = f"<{name}"
+        res = (start,) if self.isCurrentNodeClosed else (">", start)
         self.hasPreviousNode = True
         self.isCurrentNodeEmpty = True
         self.isCurrentNodeClosed = False
+        return res
 
     def onNodeContentStart(self, ns: Optional[str], name: str, process: Optional[str]):
-        yield None
+        return ()
 
     def onNodeEnd(self, ns: Optional[str], name: str, process: Optional[str]):
         if ns == "pi":
-            yield "?>\n"
+            res = ("?>\n",)
         elif self.isCurrentNodeEmpty:
-            yield " />"
+            res = (" />",)
+        elif ns:
+            res = (f"</{ns}:{name}>",)
         else:
-            yield f"</{ns+':' if ns else ''}{name}>"
+            res = (f"</{name}>",)
         self.isCurrentNodeEmpty = False
         self.isCurrentNodeClosed = True
+        return res
 
     def onAttribute(self, ns: Optional[str], name: str, value: Optional[str]):
         svalue = '"' + value.replace('"', '\\"') + '"' if value else ""
         attr = f" {ns}:{name}={svalue}" if ns else f" {name}={svalue}"
-        yield attr
+        return (attr,)
 
     def onContentLine(self, text: str):
         if not self.isCurrentNodeClosed:
-            yield ">"
             self.isCurrentNodeClosed = True
+            sep = ">"
         else:
-            yield "\n"
+            sep = "\n"
         self.isCurrentNodeEmpty = False
-        yield self.escape(text)
+        return (sep, self.escape(text))
 
     def onRawContentLine(self, text: str):
-        yield from self.onContentLine(text)
+        return self.onContentLine(text)
 
     def onCommentLine(self, text: str, indent: int):
+        res: tuple[str, ...] = ()
         if not self.isCurrentNodeClosed:
-            yield ">"
+            res = (">",)
             self.isCurrentNodeClosed = True
         self.isCurrentNodeEmpty = False
         if self.options and self.options.comments:
-            yield (f"<!-- {text} -->\n")
+            res += (f"<!-- {text} -->\n",)
+        return res
 
     # =========================================================================
     # HELPERS
     # =========================================================================
 
     def escape(self, line: str) -> str:
-        # NOTE: This could be rewritten
-        return xml.sax.saxutils.escape(line)
+        # NOTE: This is what `xml.sax.saxutils.escape` does, without the
+        # extra call. Chained `str.replace` is faster than `str.translate`
+        # here, as the latter is slow with multi-character replacements.
+        return line.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
 
 
 # -----------------------------------------------------------------------------
@@ -799,21 +939,38 @@ class Writer:
     """A default writer that writes content to an output stream (stdout by
     default)."""
 
+    # The number of fragments that are buffered before being written.
+    BUFFER_SIZE = 1024
+
     def __init__(self, stream=sys.stdout):
         self.out = stream
 
     def write(self, iterable):
-        """Writes the iterable elements to the output stream."""
-        for _ in iterable:
-            if _ is None:
-                pass
-            elif isinstance(_, str):
-                self.out.write(_)
-            elif isinstance(_, ParseError):
-                logging.error(str(_))
-            else:
-                self.out.write(json.dumps(_))
-                self.out.write("\n")
+        """Writes the iterable elements to the output stream. Fragments
+        are buffered and joined, as emitters tend to produce many small
+        strings."""
+        buf: list[str] = []
+        try:
+            for _ in iterable:
+                if _ is None:
+                    pass
+                elif isinstance(_, str):
+                    buf.append(_)
+                    if len(buf) >= self.BUFFER_SIZE:
+                        self.out.write("".join(buf))
+                        buf.clear()
+                elif isinstance(_, ParseError):
+                    if buf:
+                        self.out.write("".join(buf))
+                        buf.clear()
+                    logging.error(str(_))
+                else:
+                    buf.append(json.dumps(_))
+                    buf.append("\n")
+        finally:
+            # NOTE: We flush on errors too, so that partial output is kept.
+            if buf:
+                self.out.write("".join(buf))
 
     def __call__(self, out):
         self.out = out
@@ -857,27 +1014,66 @@ class EmbeddedReader:
 
     def read(self, iterable):
         in_content = False
-        embed_line = self.parser.options.embedLine or None
-        embed_node = self.parser.options.embedNode or "embed|raw"
-        for i, line in enumerate(iterable):
-            # NOTE: The options might be mutated by the parser, so we need
-            # to extract the prefix each time.
-            if i == 0 and line.startswith(self.shebang):
-                pass
-            elif embed_line and line.startswith(embed_line):
+        parser = self.parser
+        embed_line = parser.options.embedLine or None
+        embed_node = parser.options.embedNode or "embed|raw"
+        embed_line_length = len(embed_line) if embed_line else 0
+        lines = iter(iterable)
+        # The first line is skipped if it is a shebang, so that the loop
+        # below doesn't need to track the line index.
+        for line in lines:
+            if not line.startswith(self.shebang):
+                lines = itertools.chain((line,), lines)
+            break
+        for line in lines:
+            if embed_line and line.startswith(embed_line):
                 in_content = False
-                yield line[len(embed_line) :]
-            elif not in_content:
-                prefix = self.parser._indentPrefix * (self.parser.lastLineDepth)
-                if embed_node:
-                    yield f"{prefix}{embed_node}"
-                yield f"{prefix}{line}"
-                in_content = True
+                yield line[embed_line_length:]
             else:
-                prefix = self.parser._indentPrefix * (self.parser.lastLineDepth)
+                # NOTE: The indentation prefix and depth are updated by the
+                # parser as it consumes the lines, so we read them each time.
+                prefix = parser._indentPrefix * parser.lastLineDepth
+                if not in_content:
+                    if embed_node:
+                        yield f"{prefix}{embed_node}"
+                    in_content = True
                 yield f"{prefix}{line}"
 
 
+def iterLines(stream, encoding: str = "utf8", size: int = 1 << 20) -> Iterator[str]:
+    """Iterates on the lines of the given binary `stream`, without their
+    trailing EOL. The stream is read in blocks of `size` bytes that are
+    decoded and split in one go, which is faster than iterating on a text
+    wrapper line by line. Like text mode, `\r\n` and `\r` are read as
+    `\n`."""
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder(encoding)(), True
+    )
+    tail = ""
+    while block := stream.read(size):
+        lines = (tail + decoder.decode(block)).split("\n")
+        # The last line may be continued in the next block.
+        tail = lines.pop()
+        yield from lines
+    # The decoder may still hold a trailing `\r`, which ends a line too.
+    lines = (tail + decoder.decode(b"", True)).split("\n")
+    tail = lines.pop()
+    yield from lines
+    if tail:
+        yield tail
+
+
+def iterTextLines(stream: Iterable[str]) -> Iterator[str]:
+    """Iterates on the lines of the given text `stream`, without their
+    trailing EOL. Like `iterLines`, `\r\n` and `\r` are read as `\n`."""
+    for line in stream:
+        if "\r" in line:
+            line = line.replace("\r\n", "\n").replace("\r", "\n")
+            yield from (line[:-1] if line[-1:] == "\n" else line).split("\n")
+        else:
+            yield line[:-1] if line[-1:] == "\n" else line
+
+
 # -----------------------------------------------------------------------------
 #
 # HIGH-LEVEL API
@@ -888,10 +1084,18 @@ class EmbeddedReader:
 def parseIterable(
     iterable,
     out=sys.stdout,
-    options=ParseOptions(),
-    emitter=Emitter.GetDefault(),
-    writer=Writer(),
+    options: Optional[ParseOptions] = None,
+    emitter: Optional[Emitter] = None,
+    writer: Optional[Writer] = None,
 ):
+    # NOTE: The defaults are created per call, as emitters (and options,
+    # which are updated by the parser) are stateful.
+    if options is None:
+        options = ParseOptions()
+    if emitter is None:
+        emitter = Emitter.GetDefault()
+    if writer is None:
+        writer = Writer()
     parser = Parser(options)
     if options.isEmbedded:
         iterable = EmbeddedReader(parser).read(_ for _ in iterable)
@@ -901,12 +1105,16 @@ def parseIterable(
 def parseString(
     text: str,
     out=sys.stdout,
-    options=ParseOptions(),
-    emitter=Emitter.GetDefault(),
-    writer=Writer(),
+    options: Optional[ParseOptions] = None,
+    emitter: Optional[Emitter] = None,
+    writer: Optional[Writer] = None,
 ):
+    # Lines are split on newlines only, like `iterLines` does.
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    if not lines[-1]:
+        lines.pop()
     return parseIterable(
-        (_[:-1] for _ in text.split("\n")),
+        lines,
         out=out,
         options=options,
         emitter=emitter,
@@ -914,28 +1122,66 @@ def parseString(
     )
 
 
+def parseBytes(
+    data: bytes,
+    out=sys.stdout,
+    options: Optional[ParseOptions] = None,
+    emitter: Optional[Emitter] = None,
+    writer: Optional[Writer] = None,
+    encoding: str = "utf8",
+):
+    """Parses the given `data`, decoded using the given `encoding`. This
+    is used when the content has already been read, for instance by the
+    command-line interface that prefetches the input files."""
+    with io.BytesIO(data) as f:
+        return parseIterable(
+            iterLines(f, encoding),
+            out=out,
+            options=options,
+            emitter=emitter,
+            writer=writer,
+        )
+
+
 def parsePath(
     path: str,
     out=sys.stdout,
-    options=ParseOptions(),
-    emitter: Emitter = Emitter.GetDefault(),
-    writer=Writer(),
+    options: Optional[ParseOptions] = None,
+    emitter: Optional[Emitter] = None,
+    writer: Optional[Writer] = None,
 ):
-    with open(path) as f:
+    """Parses the file at the given `path`. The file is streamed line by
+    line as the parser consumes it, and the writer fully consumes the
+    parser before the file is closed."""
+    with open(path, "rb") as f:
         return parseIterable(
-            f.readlines(), out=out, options=options, emitter=emitter, writer=writer
+            iterLines(f),
+            out=out,
+            options=options,
+            emitter=emitter,
+            writer=writer,
         )
 
 
 def parseStream(
     stream,
     out=sys.stdout,
-    options=ParseOptions(),
-    emitter: Emitter = Emitter.GetDefault(),
-    writer=Writer(),
+    options: Optional[ParseOptions] = None,
+    emitter: Optional[Emitter] = None,
+    writer: Optional[Writer] = None,
 ):
+    """Parses the given text or binary `stream`, which is consumed line by
+    line as the parser goes. Binary streams are decoded as UTF-8."""
     return parseIterable(
-        stream.readlines(), out=out, options=options, emitter=emitter, writer=writer
+        (
+            iterLines(stream)
+            if isinstance(stream, (io.RawIOBase, io.BufferedIOBase))
+            else iterTextLines(stream)
+        ),
+        out=out,
+        options=options,
+        emitter=emitter,
+        writer=writer,
     )
 
 
@@ -948,6 +1194,11 @@ EMITTERS: dict[str, Type[Emitter]] = {
 
 if __name__ == "__main__":
     path = sys.argv[1]
-    text = open(path).read() if os.path.exists(path) else path
+    # NOTE: Files are streamed by `parsePath`, in blocks, rather than
+    # read in memory as a whole.
+    if os.path.exists(path):
+        parsePath(path)
+    else:
+        parseString(path)
 
 # EOF - vim: ts=4 sw=4 et
@@ -0,0 +1,27 @@
+import io
+import contextlib
+from tdoc.command import resolveEmitter, run
+
+# Exact names resolve to themselves
+for name in ("xml", "events", "tdoc", "null"):
+    assert resolveEmitter(name) == name
+# An unambiguous prefix resolves to its emitter
+assert resolveEmitter("ev") == "events"
+assert resolveEmitter("x") == "xml"
+# Empty and unknown names do not resolve
+assert resolveEmitter("") is None
+assert resolveEmitter("bogus") is None
+assert resolveEmitter("xmlx") is None
+
+# An invalid emitter is a usage error, reported with exit code 2
+stderr = io.StringIO()
+try:
+    with contextlib.redirect_stderr(stderr):
+        run(["-O", "bogus"])
+except SystemExit as e:
+    assert e.code == 2
+else:
+    raise AssertionError("Expected `-O bogus` to exit")
+assert "invalid choice: 'bogus'" in stderr.getvalue()
+
+# EOF
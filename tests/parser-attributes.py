@@ -1,14 +1,31 @@
-from tdoc.parser import Parser, XMLEmitter, RE_ATTR, STR_SQ, STR_DQ
-import re
+import time
+from tdoc.parser import (
+    Parser,
+    ParsedAttribute,
+    XMLEmitter,
+    NullEmitter,
+    RE_ATTR,
+    RE_STR_SQ,
+    RE_STR_DQ,
+)
 
 
-assert re.match(STR_SQ, "''")
-assert re.match(STR_SQ, "'singlequoted'")
-assert re.match(STR_SQ, "'single quoted'")
+assert RE_STR_SQ.match("''")
+assert RE_STR_SQ.match("'singlequoted'")
+assert RE_STR_SQ.match("'single quoted'")
 
-assert re.match(STR_DQ, '""')
-assert re.match(STR_DQ, '"singlequoted"')
-assert re.match(STR_DQ, '"single quoted"')
+assert RE_STR_DQ.match('""')
+assert RE_STR_DQ.match('"singlequoted"')
+assert RE_STR_DQ.match('"single quoted"')
+assert RE_STR_SQ.match("'escaped \\' quote'").end() == 18
+assert RE_STR_DQ.match('"escaped \\" quote"').end() == 18
+# Unterminated strings with many escapes must fail without backtracking
+t = time.perf_counter()
+unterminated = "'a" + "\\'" * 1000
+assert not RE_STR_SQ.match(unterminated)
+# ...and attribute values then fall back to bare values
+assert RE_ATTR.match("a=" + unterminated).end() == len(unterminated) + 2
+assert time.perf_counter() - t < 0.01
 assert RE_ATTR.match("a=1")
 assert RE_ATTR.match("a='1'")
 assert RE_ATTR.match('a="1"')
@@ -18,6 +35,10 @@ p = Parser()
 assert p.matchNode("document")
 assert p.matchNode("document svg=http://www.w3.org/2000/svg")
 assert p.matchNode("document xmlns:svg=http://www.w3.org/2000/svg")
+# A failing node line with many quoted attributes must fail in linear time
+t = time.perf_counter()
+assert not p.matchNode("document" + ' a="1"' * 1000 + " !")
+assert time.perf_counter() - t < 0.01
 match = p.matchNode("document a=1 b='2' c=\"3\"")
 parsed = p.parseNode(match)
 
@@ -25,15 +46,82 @@ match = p.matchNode('svg:rect x="10" y="10" width="30" height="30" fill="#FF6B6B
 parsed = p.parseNode(match)
 print(parsed)
 
+# Node lines are cached, repeated lines share the same node
+p = Parser()
+node = p.parseNodeLine("rect x=1 y=2")
+assert node and p.parseNodeLine("rect x=1 y=2") is node
+assert p.parseNodeLine("some text") is None
+# An explicit `id=` still wins over the inline `#id` on cache hits
+for _ in range(2):
+    node = p.parseNodeLine("node#inline id=explicit a=1")
+    assert node and node.attributes == (
+        ParsedAttribute(None, "id", "explicit"),
+        ParsedAttribute(None, "a", "1"),
+    )
+# Inline `tdoc:indent` still applies each time the line is seen
+p, e = Parser(), NullEmitter()
+list(p.start(e))
+for line, prefix in (
+    ('spaced tdoc:indent="spaces=2"', "  "),
+    ('tabbed tdoc:indent="tabs=1"', "\t"),
+    ('spaced tdoc:indent="spaces=2"', "  "),
+):
+    list(p.feed(line, e))
+    assert p._indentPrefix == prefix
+# The cache is reset once it holds 1024 lines
+p = Parser()
+for i in range(1024):
+    p.parseNodeLine(f"node n={i}")
+assert len(p._nodeCache) == 1024
+p.parseNodeLine("node n=1024")
+assert len(p._nodeCache) == 1
+
+
+# An overridden `onAttribute` receives the inline attributes too
+class RecordingParser(Parser):
+    def __init__(self):
+        super().__init__()
+        self.attributes: list = []
+
+    def onAttribute(self, emitter, ns, name, value):
+        self.attributes.append((ns, name, value))
+        yield from super().onAttribute(emitter, ns, name, value)
+
+
+p, e = RecordingParser(), NullEmitter()
+list(p.start(e))
+for line in ("node a=1 svg:b=2", "\t@c 3"):
+    list(p.feed(line, e))
+assert p.attributes == [(None, "a", "1"), ("svg", "b", "2"), (None, "c", "3")]
+
+
+# Without an override, `tdoc:indent` still goes through `Parser.onAttribute`
+# and does not reach the emitter, unlike the other attributes.
+class RecordingEmitter(NullEmitter):
+    def __init__(self):
+        super().__init__()
+        self.attributes: list = []
+
+    def onAttribute(self, ns, name, value):
+        self.attributes.append((ns, name, value))
+        return ()
+
+
+p, e = Parser(), RecordingEmitter()
+list(p.start(e))
+list(p.feed('node a=1 tdoc:indent="spaces=2"', e))
+assert p._indentPrefix == "  "
+assert e.attributes == [(None, "a", "1")]
+
 #
 # e = XMLEmitter()
-# for atom in p.feed("document xmlns:svg=http://www.w3.org/2000/svg\n", e):
+# for atom in p.feed("document xmlns:svg=http://www.w3.org/2000/svg", e):
 #     print(atom)
-# for atom in p.feed("\tsvg:svg width=300 height=100\n", e):
+# for atom in p.feed("\tsvg:svg width=300 height=100", e):
 #     print(atom)
 #
 # for atom in p.feed(
-#     '\t\tsvg:rect x="10" y="10" width="30" height="30" fill="#FF6B6B"\n', e
+#     '\t\tsvg:rect x="10" y="10" width="30" height="30" fill="#FF6B6B"', e
 # ):
 #     print(atom)
 
@@ -0,0 +1,39 @@
+import io
+from tdoc.parser import iterLines, parseString, parseBytes, parseStream
+
+
+def lines(data: bytes, size: int = 1 << 20) -> list[str]:
+    return list(iterLines(io.BytesIO(data), size=size))
+
+
+# Lines are yielded without their EOL, whatever the block size
+for size in (1, 2, 3, 1 << 20):
+    assert lines(b"", size) == []
+    assert lines(b"a", size) == ["a"]
+    assert lines(b"a\n", size) == ["a"]
+    assert lines(b"a\n\nb", size) == ["a", "", "b"]
+    # CRLF and CR are read as LF, even when split across blocks
+    assert lines(b"ab\r\ncd\r\n", size) == ["ab", "cd"]
+    assert lines(b"a\r\n\r\nb", size) == ["a", "", "b"]
+    assert lines(b"a\rb\r", size) == ["a", "b"]
+    assert lines(b"section|pre\r\n\tabc\r", size) == ["section|pre", "\tabc"]
+    assert lines(b"\r", size) == [""]
+    # Multibyte characters are decoded across blocks
+    assert lines("é€\n😀".encode("utf8"), size) == ["é€", "😀"]
+
+# Strings, bytes and text streams are split the same way, on newlines only
+for text in (
+    "node\x0cbody",
+    "a\r\nb\rc\n",
+    "doc a=1\r\n\tchild: hi\r\n",
+    "doc\r\tchild: hi\r",
+    "a\u2028b\n\n",
+    "",
+):
+    from_string, from_bytes, from_stream = io.StringIO(), io.StringIO(), io.StringIO()
+    parseString(text, out=from_string)
+    parseBytes(text.encode("utf8"), out=from_bytes)
+    parseStream(io.StringIO(text), out=from_stream)
+    assert from_string.getvalue() == from_bytes.getvalue() == from_stream.getvalue()
+
+# EOF